@@ -1,38 +1,191 @@
 import asyncio
-import json
+import copy
+import logging
+import math
+import sys
+import time
+from collections import OrderedDict
 from contextlib import AsyncExitStack
-from typing import Any, Dict, List, Optional
-import nest_asyncio
+from typing import Any, Dict, List, Optional, Tuple
+import orjson
+import xxhash
+import numpy as np
 from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
 import google.generativeai as genai
+from router import is_simple_lookup, route_query
 
 
+log = logging.getLogger(__name__)
+
 # Add your API key 
 GEMINI_API_KEY = "" 
 
-# Apply nest_asyncio to allow nested event loops (needed for Jupyter/IPython)
-nest_asyncio.apply()
+# Upper bound on concurrent tool calls sent over the single stdio session
+MAX_CONCURRENT_TOOL_CALLS = 4
+
+# Upper bound on concurrent queries sent to Gemini, to stay within rate limits
+MAX_CONCURRENT_QUERIES = 4
+
+# Maximum number of tool results kept by each cache before the oldest are evicted
+MAX_TOOL_CACHE_ENTRIES = 1024
+
+# Cosine similarity above which a semantic cache entry is treated as a hit
+SEMANTIC_CACHE_THRESHOLD = 0.93
+
+# Nearest entries checked per semantic lookup, so expired or other-tool neighbours don't hide a fresh hit
+SEMANTIC_CACHE_CANDIDATES = 8
+
+# Tools whose results may be reused for similar, not just identical, arguments.
+# Tools like calculate are left out: a one-character change gives a different answer.
+_SEMANTIC_CACHE_TOOLS = frozenset({"get_weather"})
+
+# Tools whose results are already user-facing sentences and need no Gemini rewording
+_PASSTHROUGH_TOOLS = frozenset({"get_weather", "calculate", "get_time"})
+
+# Prefixes of the server's replies for inputs a tool cannot answer
+_TOOL_MISS_PREFIXES = ("Sorry, ", "Error evaluating expression")
+
+# Apply nest_asyncio to allow nested event loops, only when running under Jupyter/IPython
+if "ipykernel" in sys.modules:
+    import nest_asyncio
+    nest_asyncio.apply()
+
+
+class SemanticToolCache:
+    """Similarity cache for tool results, consulted when the exact-match cache misses.
+
+    Tool arguments are embedded with a local SentenceTransformer and searched
+    in a FAISS inner-product index. Only the argument values are embedded (the
+    tool name is matched exactly), so shared JSON boilerplate cannot make two
+    different cities look alike.
+    Requires the optional ``sentence-transformers`` and ``faiss`` packages.
+    """
+
+    def __init__(
+        self,
+        model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
+        threshold: float = SEMANTIC_CACHE_THRESHOLD,
+        max_entries: int = MAX_TOOL_CACHE_ENTRIES,
+    ):
+        """Initialize the semantic cache.
+
+        Args:
+            model_name: The SentenceTransformer model used to embed tool calls.
+            threshold: Minimum cosine similarity for a cache hit.
+            max_entries: Maximum number of stored results; the oldest are evicted first.
+        """
+        import faiss
+        from sentence_transformers import SentenceTransformer
+
+        self.encoder = SentenceTransformer(model_name)
+        self.index = faiss.IndexFlatIP(self.encoder.get_sentence_embedding_dimension())
+        self.threshold = threshold
+        self.max_entries = max_entries
+        # (tool name, stored at, result text) for each vector, in index order
+        self.entries: List[Tuple[str, float, str]] = []
+
+    @staticmethod
+    def text_for(args: Dict[str, Any]) -> str:
+        """Text embedded for a tool call: its argument values in key order."""
+        return " ".join(str(args[key]) for key in sorted(args))
+
+    async def embed(self, text: str) -> Any:
+        """Embed tool-call text in a worker thread, off the event loop."""
+        # Normalized vectors make inner product equal to cosine similarity
+        vectors = await asyncio.to_thread(self.encoder.encode, [text], normalize_embeddings=True)
+        return vectors.astype("float32")
+
+    def get(self, tool_name: str, vector: Any, ttl: float, now: float) -> Optional[str]:
+        """Return the closest fresh result for the same tool, if similar enough."""
+        if not self.entries:
+            return None
+        scores, ids = self.index.search(vector, min(SEMANTIC_CACHE_CANDIDATES, len(self.entries)))
+        # Candidates come back best first, so stop at the first one below the threshold
+        for score, idx in zip(scores[0], ids[0]):
+            if idx < 0 or score < self.threshold:
+                break
+            name, stored_at, text = self.entries[idx]
+            if name == tool_name and now - stored_at < ttl:
+                return text
+        return None
+
+    def put(self, tool_name: str, vector: Any, now: float, text: str, ttl: float):
+        """Store a freshly executed tool result, dropping that tool's expired results."""
+        stale = [
+            idx for idx, (name, stored_at, _) in enumerate(self.entries)
+            if name == tool_name and now - stored_at >= ttl
+        ]
+        # Evict the oldest entry too if the cache would otherwise exceed its cap
+        if len(self.entries) - len(stale) >= self.max_entries and 0 not in stale:
+            stale.insert(0, 0)
+        if stale:
+            # A flat index renumbers remaining vectors on removal, matching the list order
+            self.index.remove_ids(np.array(stale, dtype="int64"))
+            dropped = set(stale)
+            self.entries = [entry for idx, entry in enumerate(self.entries) if idx not in dropped]
+        self.index.add(vector)
+        self.entries.append((tool_name, now, text))
 
 
 class MCPGeminiClient:
     """Client for interacting with Google Gemini models using MCP tools."""
 
-    def __init__(self, model: str = "gemini-1.5-flash"): 
+    __slots__ = (
+        "session",
+        "exit_stack",
+        "gemini_model",
+        "model_name",
+        "stdio",
+        "write",
+        "_gemini_tools",
+        "_tool_schemas",
+        "_tool_cache",
+        "_tool_ttls",
+        "_tool_semaphore",
+        "_semantic_cache",
+    )
+
+    def __init__(
+        self,
+        model: str = "gemini-1.5-flash",
+        max_concurrent_tool_calls: int = MAX_CONCURRENT_TOOL_CALLS,
+        semantic_cache: bool = False,
+    ): 
         """Initialize the Google Gemini MCP client.
 
         Args:
             model: The Google Gemini model to use.
+            max_concurrent_tool_calls: Maximum number of MCP tool calls in flight at once.
+            semantic_cache: Also reuse results of similar (not just identical) tool calls
+                for the tools in _SEMANTIC_CACHE_TOOLS.
         """
         self.session: Optional[ClientSession] = None
         self.exit_stack = AsyncExitStack()
         
         genai.configure(api_key=GEMINI_API_KEY)
 
-        self.gemini_model = genai.GenerativeModel(model)
+        # Created in connect_to_server once the tool list is known
+        self.gemini_model: Optional[genai.GenerativeModel] = None
         self.model_name = model
         self.stdio: Optional[Any] = None
         self.write: Optional[Any] = None
+        # Gemini-format tool list, fetched once at connect time
+        self._gemini_tools: List[Dict[str, Any]] = []
+        # Cleaned parameter schemas keyed on tool name
+        self._tool_schemas: Dict[str, Dict[str, Any]] = {}
+        # LRU of tool results keyed on (tool name, xxh3 of canonical args JSON) -> (stored at, result text)
+        self._tool_cache: "OrderedDict[Tuple[str, int], Tuple[float, str]]" = OrderedDict()
+        # Per-tool cache lifetime in seconds; 0 disables caching for that tool
+        self._tool_ttls: Dict[str, float] = {
+            "get_weather": 300,
+            "calculate": math.inf,
+            "get_time": 0,
+        }
+        self._tool_semaphore = asyncio.Semaphore(max_concurrent_tool_calls)
+        self._semantic_cache: Optional[SemanticToolCache] = (
+            SemanticToolCache() if semantic_cache else None
+        )
 
     async def connect_to_server(self, server_script_path: str = "server.py"):
         """Connect to an MCP server.
@@ -55,28 +208,33 @@ class MCPGeminiClient:
 
         await self.session.initialize()
 
-        tools_result = await self.session.list_tools()
+        # The server's tool set is static, so fetch and convert it only once
+        self._gemini_tools = await self.get_mcp_tools()
+        # Bind the tools to the model once so each query only sends its contents
+        self.gemini_model = genai.GenerativeModel(
+            self.model_name,
+            tools=self._gemini_tools,
+            tool_config={"function_calling_config": "AUTO"},
+        )
         print("\nConnected to server with tools:")
-        for tool in tools_result.tools:
-            print(f"  - {tool.name}: {tool.description}")
+        for tool in self._gemini_tools:
+            declaration = tool["function_declarations"][0]
+            print(f"  - {declaration['name']}: {declaration['description']}")
 
     def _clean_schema_for_gemini(self, schema: Dict[str, Any]) -> Dict[str, Any]:
-        """Recursively cleans a JSON schema for Gemini compatibility.
+        """Cleans a JSON schema for Gemini compatibility.
         Removes 'title' and potentially other unsupported fields.
+        Works iteratively on a deep copy so the MCP tool's schema is left untouched.
         """
-        cleaned_schema = {}
-        for key, value in schema.items():
-            if key == "title": # Skip the 'title' field
-                continue
-            if isinstance(value, dict):
-                cleaned_schema[key] = self._clean_schema_for_gemini(value)
-            elif isinstance(value, list):
-                cleaned_schema[key] = [
-                    self._clean_schema_for_gemini(item) if isinstance(item, dict) else item
-                    for item in value
-                ]
-            else:
-                cleaned_schema[key] = value
+        cleaned_schema = copy.deepcopy(schema)
+        stack = [cleaned_schema]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, dict):
+                node.pop("title", None) # Drop the 'title' field
+                stack.extend(node.values())
+            elif isinstance(node, list):
+                stack.extend(node)
         return cleaned_schema
 
     async def get_mcp_tools(self) -> List[Dict[str, Any]]: 
@@ -88,8 +246,12 @@ class MCPGeminiClient:
         tools_result = await self.session.list_tools()
         gemini_tools = []
         for tool in tools_result.tools:
-            cleaned_parameters_schema = self._clean_schema_for_gemini(tool.inputSchema)
-            print("cleaned parameter schema for {tool.name}", cleaned_parameters_schema)
+            cleaned_parameters_schema = self._tool_schemas.get(tool.name)
+            if cleaned_parameters_schema is None:
+                cleaned_parameters_schema = self._clean_schema_for_gemini(tool.inputSchema)
+                self._tool_schemas[tool.name] = cleaned_parameters_schema
+                if log.isEnabledFor(logging.DEBUG):
+                    log.debug("cleaned parameter schema for %s: %s", tool.name, cleaned_parameters_schema)
 
             gemini_tools.append(
                 {
@@ -104,6 +266,64 @@ class MCPGeminiClient:
             )
         return gemini_tools
 
+    def _route_query(self, query: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """Match a query against the intent rules.
+
+        Args:
+            query: The user query.
+
+        Returns:
+            The tool name and arguments to call, or None to fall back to Gemini.
+        """
+        return route_query(query, self._tool_schemas)
+
+    async def _call_tool(self, name: str, args: Dict[str, Any]) -> str:
+        """Call an MCP tool, reusing a cached result while it is still fresh.
+
+        Args:
+            name: The name of the tool to call.
+            args: The arguments for the tool.
+
+        Returns:
+            The text content of the tool result.
+        """
+        ttl = self._tool_ttls.get(name, 0)
+        args_json = orjson.dumps(args, option=orjson.OPT_SORT_KEYS)
+        # Hash the canonical JSON once so the cache key is a small int, not a long string
+        key = (name, xxhash.xxh3_64_intdigest(args_json))
+        now = time.monotonic()
+        vector = None
+
+        if ttl:
+            cached = self._tool_cache.get(key)
+            if cached is not None and now - cached[0] < ttl:
+                self._tool_cache.move_to_end(key)
+                return cached[1]
+            if self._semantic_cache is not None and name in _SEMANTIC_CACHE_TOOLS:
+                vector = await self._semantic_cache.embed(SemanticToolCache.text_for(args))
+                similar = self._semantic_cache.get(name, vector, ttl, now)
+                if similar is not None:
+                    return similar
+
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Calling MCP Tool: %s with args: %s", name, args)
+        async with self._tool_semaphore:
+            result = await self.session.call_tool(name, arguments=args)
+        text = result.content[0].text
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("MCP Tool Result: %s", text)
+
+        # MCP-level errors (e.g. argument validation failures) are never cached
+        if ttl and not result.isError:
+            self._tool_cache[key] = (now, text)
+            self._tool_cache.move_to_end(key)
+            # Evict least recently used results once the cache is full
+            while len(self._tool_cache) > MAX_TOOL_CACHE_ENTRIES:
+                self._tool_cache.popitem(last=False)
+            if vector is not None:
+                self._semantic_cache.put(name, vector, now, text, ttl)
+        return text
+
     async def process_query(self, query: str) -> str:
         """Process a query using Google Gemini and available MCP tools.
 
@@ -113,35 +333,62 @@ class MCPGeminiClient:
         Returns:
             The response from Google Gemini.
         """
-        tools = await self.get_mcp_tools()
+        # Queries that plainly match a tool intent skip Gemini entirely, unless the
+        # tool could not answer the captured argument (e.g. "NYC"); Gemini may
+        # normalize it into one the tool knows
+        routed = self._route_query(query)
+        if routed is not None:
+            routed_result = await self._call_tool(*routed)
+            if not routed_result.startswith(_TOOL_MISS_PREFIXES):
+                return routed_result
 
         contents = [{"role": "user", "parts": [query]}]
 
-        response = await self.gemini_model.generate_content_async(
-            contents,
-            tools=tools,
-            tool_config={"function_calling_config": "AUTO"}
-        )
+        response = await self.gemini_model.generate_content_async(contents, stream=True)
 
+        # Start each tool call as soon as its function_call part streams in,
+        # so MCP round-trips overlap with the rest of the model's output
         function_calls = []
-        # Ensure response and its content exist before accessing
-        if response.candidates and response.candidates[0].content:
-            for part in response.candidates[0].content.parts:
-                if hasattr(part, 'function_call') and part.function_call:
-                    function_calls.append(part.function_call)
+        tool_tasks = []
+        try:
+            async for chunk in response:
+                if not (chunk.candidates and chunk.candidates[0].content):
+                    continue
+                for part in chunk.candidates[0].content.parts:
+                    if hasattr(part, 'function_call') and part.function_call:
+                        function_calls.append(part.function_call)
+                        tool_tasks.append(asyncio.create_task(
+                            self._call_tool(part.function_call.name, dict(part.function_call.args))
+                        ))
+        except BaseException:
+            for task in tool_tasks:
+                task.cancel()
+            raise
 
         if function_calls:
             # Append the model's tool call response (the functionCall part) to the contents
             # This is important for the model to understand the conversation flow.
+            # After streaming, the response holds the parts merged from every chunk.
             contents.append(response.candidates[0].content)
 
-            for tool_call in function_calls:
-                print(f"DEBUG: Calling MCP Tool: {tool_call.name} with args: {tool_call.args}")
-                result = await self.session.call_tool(
-                    tool_call.name,
-                    arguments=tool_call.args,
-                )
-                print(f"DEBUG: MCP Tool Result: {result.content[0].text}")
+            # Independent tool calls run concurrently; results keep the call order
+            results = await asyncio.gather(*tool_tasks, return_exceptions=True)
+
+            # A single plain lookup is answered with the tool output as-is, skipping the
+            # second turn; anything that needs comparing or reasoning goes back to Gemini
+            if (
+                len(function_calls) == 1
+                and function_calls[0].name in _PASSTHROUGH_TOOLS
+                and not isinstance(results[0], Exception)
+                and is_simple_lookup(query)
+            ):
+                return results[0]
+
+            for tool_call, result in zip(function_calls, results):
+                if isinstance(result, Exception):
+                    result_text = f"Error calling tool {tool_call.name}: {result}"
+                else:
+                    result_text = result
 
                 contents.append(
                     {
@@ -150,7 +397,7 @@ class MCPGeminiClient:
                             {
                                 "function_response": { # <-- THIS KEY WAS CHANGED
                                     "name": tool_call.name,
-                                    "response": {"result": result.content[0].text} # The result payload
+                                    "response": {"result": result_text} # The result payload
                                 }
                             }
                         ]
@@ -158,14 +405,11 @@ class MCPGeminiClient:
                 )
                 
             # Send the updated contents (including tool call and its result) back to Gemini
-            final_response = await self.gemini_model.generate_content_async(
-                contents,
-                tools=tools,
-                tool_config={"function_calling_config": "AUTO"}
-            )
+            final_response = await self.gemini_model.generate_content_async(contents)
             
             if final_response.candidates and final_response.candidates[0].content and final_response.candidates[0].content.parts:
-                return "".join([part.text for part in final_response.candidates[0].content.parts if hasattr(part, 'text')])
+                parts = final_response.candidates[0].content.parts
+                return "".join(text for text in (getattr(part, 'text', None) for part in parts) if text)
             else:
                 return "No discernable text response after tool execution."
 
@@ -180,10 +424,71 @@ class MCPGeminiClient:
         await self.exit_stack.aclose()
 
 
+# Connected clients shared by every caller on an event loop, keyed on the loop and
+# server script, so each server subprocess is spawned once rather than per client.
+# The stdio session is bound to the loop that opened it, so loops never share a client.
+_clients: Dict[Tuple[asyncio.AbstractEventLoop, str], Tuple[MCPGeminiClient, Dict[str, Any]]] = {}
+_client_locks: Dict[asyncio.AbstractEventLoop, asyncio.Lock] = {}
+
+
+def _loop_lock(loop: asyncio.AbstractEventLoop) -> asyncio.Lock:
+    """Get the lock guarding the shared clients of a loop, dropping state of closed loops."""
+    for stale in [other for other in _client_locks if other.is_closed()]:
+        del _client_locks[stale]
+    for key in [key for key in _clients if key[0].is_closed()]:
+        del _clients[key]
+    return _client_locks.setdefault(loop, asyncio.Lock())
+
+
+async def get_client(server_script_path: str = "server.py", **client_kwargs: Any) -> MCPGeminiClient:
+    """Get the shared client for the running loop, connecting to the MCP server on first use.
+
+    Args:
+        server_script_path: Path to the server script.
+        **client_kwargs: Arguments for MCPGeminiClient (e.g. semantic_cache=True),
+            used when the client is created.
+
+    Returns:
+        A connected client.
+
+    Raises:
+        ValueError: If client_kwargs differ from those the existing shared client was created with.
+    """
+    loop = asyncio.get_running_loop()
+    key = (loop, server_script_path)
+    async with _loop_lock(loop):
+        shared = _clients.get(key)
+        if shared is not None:
+            client, created_with = shared
+            if client_kwargs and client_kwargs != created_with:
+                raise ValueError(
+                    f"Shared client for {server_script_path} was created with {created_with}, "
+                    f"not {client_kwargs}"
+                )
+            return client
+
+        client = MCPGeminiClient(**client_kwargs)
+        try:
+            await client.connect_to_server(server_script_path)
+        except BaseException:
+            await client.cleanup()
+            raise
+        _clients[key] = (client, client_kwargs)
+        return client
+
+
+async def close_client():
+    """Clean up the shared clients created on the running loop."""
+    loop = asyncio.get_running_loop()
+    async with _loop_lock(loop):
+        for key in [key for key in _clients if key[0] is loop]:
+            client, _ = _clients.pop(key)
+            await client.cleanup()
+
+
 async def main():
     """Main entry point for the client."""
-    client = MCPGeminiClient()
-    await client.connect_to_server("server.py")
+    client = await get_client("server.py")
 
     queries = [
         "What's the weather like in London?",
@@ -192,14 +497,26 @@ async def main():
         "Tell me a fun fact about giraffes."
     ]
 
-    for query in queries:
+    # Queries are independent, so run them concurrently and print in order
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_QUERIES)
+
+    async def run_query(query: str) -> str:
+        async with semaphore:
+            return await client.process_query(query)
+
+    responses = await asyncio.gather(*(run_query(query) for query in queries))
+
+    for query, response in zip(queries, responses):
         print(f"\nQuery: {query}")
-        response = await client.process_query(query)
         print(f"\nResponse: {response}")
         print("-" * 30)
 
-    await client.cleanup()
-
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    # The shared client's transport must be closed on the loop that opened it,
+    # so cleanup runs on the same runner rather than from an atexit hook
+    with asyncio.Runner() as runner:
+        try:
+            runner.run(main())
+        finally:
+            runner.run(close_client())
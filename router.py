@@ -0,0 +1,116 @@
+import ast
+import re
+from typing import Any, Callable, Collection, Dict, List, Optional, Pattern, Tuple
+
+
+# Words that can appear capitalized after a city but are not part of its name
+_NON_CITY_WORDS = frozenset({
+    "and", "or", "vs", "versus", "in", "at", "on", "for", "when", "than",
+    "now", "right", "today", "tonight", "tomorrow", "yesterday",
+    "this", "next", "week", "weekend", "morning", "afternoon", "evening",
+    "celsius", "fahrenheit",
+})
+
+# Words that signal a query needs more than a tool result read back verbatim
+_REASONING_WORDS = re.compile(
+    r"\b(?:than|vs|versus|compare[ds]?|comparison|difference|between|better|worse|"
+    r"warmer|colder|hotter|cooler|earlier|later|more|less|should|would|could|why|how|"
+    r"which|whether|if|or|and|both|each|convert|explain|recommend|suggest|plan)\b",
+    re.I,
+)
+
+# One to three words, each starting with a letter (non-ASCII included)
+_CITY = r"([^\W\d_][\w'.\-]*(?:\s+[^\W\d_][\w'.\-]*){0,2})"
+_WHAT_IS = r"(?:what(?:['’]s| is)\s+)"
+_END = r"\s*[?.!]*"
+
+# Three or more numbers joined only by hyphens read as dates or IDs, not subtraction
+_HYPHEN_CHAIN = re.compile(r"\d+(?:-\d+){2,}")
+
+
+def _city_args(match: "re.Match[str]") -> Optional[Dict[str, Any]]:
+    """Accept the captured city only if every word is capitalized and not a filler word."""
+    city = match.group(1)
+    for word in city.split():
+        if not word[0].isupper() or word.casefold() in _NON_CITY_WORDS:
+            return None
+    return {"city": city}
+
+
+def _expression_args(match: "re.Match[str]") -> Optional[Dict[str, Any]]:
+    """Accept the captured text only if it parses as an arithmetic operation."""
+    expression = match.group(1).strip()
+    if _HYPHEN_CHAIN.fullmatch(expression):
+        return None
+    try:
+        node = ast.parse(expression, mode="eval").body
+    except SyntaxError:
+        return None
+    if not isinstance(node, ast.BinOp):
+        return None
+    return {"expression": expression}
+
+
+# Deterministic query patterns answered by calling a tool directly, without Gemini.
+# Each rule is (pattern matched against the whole query, tool name, args builder);
+# a builder returning None means the query is left to Gemini.
+_INTENT_RULES: List[Tuple[Pattern[str], str, Callable[["re.Match[str]"], Optional[Dict[str, Any]]]]] = [
+    (
+        re.compile(_WHAT_IS + r"?(?:the\s+)?weather(?:\s+like)?\s+in\s+" + _CITY + _END, re.I),
+        "get_weather",
+        _city_args,
+    ),
+    (
+        re.compile(
+            r"(?:what\s+time\s+is\s+it|" + _WHAT_IS + r"?(?:the\s+)?(?:current\s+|local\s+)?time)"
+            r"\s+in\s+" + _CITY + _END,
+            re.I,
+        ),
+        "get_time",
+        _city_args,
+    ),
+    (
+        # Requires an operator, so bare numbers such as "What is 1990?" are not routed
+        re.compile(
+            r"(?:" + _WHAT_IS + r"|calculate\s+|compute\s+)"
+            r"([\d(][\d\s().]*[+\-*/%][\d\s+\-*/%().]*?)\s*[?!]*",
+            re.I,
+        ),
+        "calculate",
+        _expression_args,
+    ),
+]
+
+
+def route_query(query: str, available_tools: Collection[str]) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """Match a query against the intent rules.
+
+    Args:
+        query: The user query.
+        available_tools: Names of the tools the MCP server offers.
+
+    Returns:
+        The tool name and arguments to call, or None to fall back to Gemini.
+    """
+    query = query.strip()
+    for pattern, tool_name, build_args in _INTENT_RULES:
+        if tool_name not in available_tools:
+            continue
+        match = pattern.fullmatch(query)
+        if match:
+            args = build_args(match)
+            if args is not None:
+                return tool_name, args
+    return None
+
+
+def is_simple_lookup(query: str) -> bool:
+    """Whether a query asks for a single fact a tool result answers verbatim.
+
+    Args:
+        query: The user query.
+
+    Returns:
+        False if the query compares, reasons about or combines results.
+    """
+    return _REASONING_WORDS.search(query) is None
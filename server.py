@@ -1,5 +1,9 @@
+import ast
 import math
 import datetime
+import functools
+import operator
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 from mcp.server.fastmcp import FastMCP
 
 mcp = FastMCP(
@@ -8,50 +12,132 @@ mcp = FastMCP(
     port=8050,
 )
 
-@mcp.tool()
-def get_weather(city: str) -> str:
-    """Get current weather in a specified city (mocked response)."""
-    weather_data = {
+# Names available to calculate(), built once instead of per call
+_ALLOWED = {k: v for k, v in math.__dict__.items() if not k.startswith("__")}
+
+# Limits that keep a single calculation from tying up the shared server process
+MAX_EXPONENT = 1000
+MAX_RESULT_BITS = 100_000
+MAX_COMBINATORIC_ARG = 1000
+_COMBINATORIC_FUNCS = frozenset({"factorial", "comb", "perm"})
+
+
+def _safe_pow(base, exponent):
+    """Raise to a power, rejecting exponents that would make the result huge."""
+    if abs(exponent) > MAX_EXPONENT:
+        raise ValueError(f"exponent {exponent} exceeds the limit of {MAX_EXPONENT}")
+    if isinstance(base, int) and isinstance(exponent, int) and exponent > 0:
+        if base.bit_length() * exponent > MAX_RESULT_BITS:
+            raise ValueError("result is too large to compute")
+    return operator.pow(base, exponent)
+
+
+_BIN_OPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: _safe_pow,
+}
+
+_UNARY_OPS = {
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg,
+}
+
+
+@functools.lru_cache(maxsize=256)
+def _parse(expression: str) -> ast.expr:
+    """Parse an expression once so repeated calculations skip the parser."""
+    return ast.parse(expression, mode="eval").body
+
+
+def _eval(node: ast.expr):
+    """Evaluate a parsed math expression, rejecting anything but arithmetic and math names."""
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float, complex)):
+        return node.value
+    if isinstance(node, ast.BinOp) and type(node.op) in _BIN_OPS:
+        return _BIN_OPS[type(node.op)](_eval(node.left), _eval(node.right))
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPS:
+        return _UNARY_OPS[type(node.op)](_eval(node.operand))
+    if isinstance(node, ast.Name):
+        if node.id not in _ALLOWED:
+            raise NameError(f"name '{node.id}' is not allowed")
+        return _ALLOWED[node.id]
+    if isinstance(node, ast.Call) and not node.keywords:
+        func = _eval(node.func)
+        args = [_eval(arg) for arg in node.args]
+        if isinstance(node.func, ast.Name) and node.func.id in _COMBINATORIC_FUNCS:
+            if any(isinstance(arg, int) and arg > MAX_COMBINATORIC_ARG for arg in args):
+                raise ValueError(f"{node.func.id} arguments are limited to {MAX_COMBINATORIC_ARG}")
+        return func(*args)
+    raise ValueError(f"unsupported expression: {type(node).__name__}")
+
+# Mocked weather keyed on casefolded city names
+_WEATHER = {
+    k.casefold(): v
+    for k, v in {
         "london": "It's cloudy and 18°C in London.",
         "new york": "It's sunny and 25°C in New York.",
         "tokyo": "It's rainy and 20°C in Tokyo.",
         "paris": "It's 22°C with light showers in Paris.",
-    }
-    return weather_data.get(city.lower(), f"Sorry, I don't have weather data for {city}.")
+    }.items()
+}
+
+
+@mcp.tool()
+def get_weather(city: str) -> str:
+    """Get current weather in a specified city (mocked response)."""
+    return _WEATHER.get(city.casefold(), f"Sorry, I don't have weather data for {city}.")
 
 
 @mcp.tool()
 def calculate(expression: str) -> str:
     """Evaluate a basic math expression safely."""
-    allowed_names = {k: v for k, v in math.__dict__.items() if not k.startswith("__")}
     try:
-        result = eval(expression, {"__builtins__": None}, allowed_names)
+        result = _eval(_parse(expression))
         return f"The result is: {result}"
     except Exception as e:
         return f"Error evaluating expression: {str(e)}"
 
+_CITY_TIMEZONES = {
+    "new york": "America/New_York",
+    "london": "Europe/London",
+    "tokyo": "Asia/Tokyo",
+    "paris": "Europe/Paris",
+    "sydney": "Australia/Sydney",
+}
+
+
+def _load_city_timezones() -> dict:
+    """Resolve each city's timezone, leaving out any the local tzdata lacks."""
+    zones = {}
+    for city, tz_name in _CITY_TIMEZONES.items():
+        try:
+            zones[city.casefold()] = ZoneInfo(tz_name)
+        except ZoneInfoNotFoundError:
+            continue
+    return zones
+
+
+# Timezones and display names, keyed on casefolded city names, resolved once at import so get_time is a dict lookup.
+# A missing timezone only makes get_time report that city as unavailable; the server still starts.
+CITY_TZ = _load_city_timezones()
+CITY_NAMES = {city.casefold(): city.title() for city in _CITY_TIMEZONES}
+
+
 @mcp.tool()
 def get_time(city: str) -> str:
     """Get the current time in a specified city."""
-    try:
-        from zoneinfo import ZoneInfo
-    except ImportError:
-        return "Timezone support requires Python 3.9+."
-
-    city_timezones = {
-        "new york": "America/New_York",
-        "london": "Europe/London",
-        "tokyo": "Asia/Tokyo",
-        "paris": "Europe/Paris",
-        "sydney": "Australia/Sydney",
-    }
-
-    tz_name = city_timezones.get(city.lower())
-    if not tz_name:
+    key = city.casefold()
+    tz = CITY_TZ.get(key)
+    if tz is None:
         return f"Sorry, timezone info for '{city}' isn't available."
 
-    now = datetime.datetime.now(ZoneInfo(tz_name))
-    return f"The local time in {city.title()} is {now.strftime('%Y-%m-%d %H:%M:%S')}"
+    now = datetime.datetime.now(tz)
+    return f"The local time in {CITY_NAMES[key]} is {now.strftime('%Y-%m-%d %H:%M:%S')}"
 
 if __name__ == "__main__":
     mcp.run(transport="stdio")
@@ -0,0 +1,93 @@
+import asyncio
+import importlib.util
+import unittest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+
+def _installed(*modules):
+    try:
+        return all(importlib.util.find_spec(module) is not None for module in modules)
+    except (ModuleNotFoundError, ValueError):
+        return False
+
+
+class _Stream:
+    """Stand-in for a streamed Gemini response that only contains text."""
+
+    def __init__(self, text):
+        self.text = text
+        self.candidates = [SimpleNamespace(content=SimpleNamespace(parts=[SimpleNamespace(text=text, function_call=None)]))]
+
+    async def __aiter__(self):
+        yield self
+
+
+@unittest.skipUnless(
+    _installed("mcp", "google.generativeai", "orjson", "xxhash"),
+    "client dependencies are not installed",
+)
+class ProcessQueryRoutingTest(unittest.TestCase):
+    def make_client(self, tool_reply):
+        from client import MCPGeminiClient
+
+        client = MCPGeminiClient()
+        client._tool_schemas.update({"get_weather": {}, "get_time": {}, "calculate": {}})
+        client.session = MagicMock()
+        client.session.call_tool = AsyncMock(
+            return_value=SimpleNamespace(content=[SimpleNamespace(text=tool_reply)], isError=False)
+        )
+        client.gemini_model = MagicMock()
+        client.gemini_model.generate_content_async = AsyncMock(return_value=_Stream("From Gemini"))
+        return client
+
+    def test_routed_hit_skips_gemini(self):
+        client = self.make_client("It's cloudy and 18°C in London.")
+        self.assertEqual(
+            asyncio.run(client.process_query("What's the weather in London?")),
+            "It's cloudy and 18°C in London.",
+        )
+        client.gemini_model.generate_content_async.assert_not_called()
+
+    def test_routed_miss_falls_back_to_gemini(self):
+        client = self.make_client("Sorry, timezone info for 'New York City' isn't available.")
+        self.assertEqual(asyncio.run(client.process_query("What time is it in New York City?")), "From Gemini")
+        client.gemini_model.generate_content_async.assert_awaited_once()
+
+
+@unittest.skipUnless(
+    _installed("mcp", "google.generativeai", "orjson", "xxhash", "faiss", "sentence_transformers"),
+    "client and semantic cache dependencies are not installed",
+)
+class SemanticToolCacheTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        from client import SEMANTIC_CACHE_THRESHOLD, SemanticToolCache
+
+        cls.threshold = SEMANTIC_CACHE_THRESHOLD
+        cls.cache = SemanticToolCache()
+
+    def similarity(self, args_a, args_b):
+        a = asyncio.run(self.cache.embed(self.cache.text_for(args_a)))
+        b = asyncio.run(self.cache.embed(self.cache.text_for(args_b)))
+        return float((a @ b.T)[0][0])
+
+    def test_different_cities_score_below_threshold(self):
+        for other in ["Paris", "New York", "Tokyo"]:
+            with self.subTest(other=other):
+                self.assertLess(self.similarity({"city": "London"}, {"city": other}), self.threshold)
+
+    def test_lookup_ignores_other_cities(self):
+        from client import SemanticToolCache
+
+        cache = SemanticToolCache()
+        london = asyncio.run(cache.embed(cache.text_for({"city": "London"})))
+        paris = asyncio.run(cache.embed(cache.text_for({"city": "Paris"})))
+        cache.put("get_weather", london, 0.0, "London weather", 300)
+        self.assertEqual(cache.get("get_weather", london, 300, 1.0), "London weather")
+        self.assertIsNone(cache.get("get_weather", paris, 300, 1.0))
+        self.assertIsNone(cache.get("get_weather", london, 300, 301.0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+
+from router import is_simple_lookup, route_query
+
+
+TOOLS = {"get_weather", "calculate", "get_time"}
+
+
+class RouteQueryTest(unittest.TestCase):
+    def test_routes_plain_lookups(self):
+        cases = {
+            "What's the weather like in London?": ("get_weather", {"city": "London"}),
+            "weather in New York": ("get_weather", {"city": "New York"}),
+            "What’s the weather in İstanbul?": ("get_weather", {"city": "İstanbul"}),
+            "What time is it in Tokyo?": ("get_time", {"city": "Tokyo"}),
+            "What is the local time in Paris": ("get_time", {"city": "Paris"}),
+            "What is 123 * 45 + 9?": ("calculate", {"expression": "123 * 45 + 9"}),
+            "calculate (2+3)*4.5": ("calculate", {"expression": "(2+3)*4.5"}),
+            "What is 10-3?": ("calculate", {"expression": "10-3"}),
+        }
+        for query, expected in cases.items():
+            with self.subTest(query=query):
+                self.assertEqual(route_query(query, TOOLS), expected)
+
+    def test_leaves_near_misses_to_gemini(self):
+        queries = [
+            "What's the weather in London tomorrow?",
+            "What's the weather in London Tomorrow?",
+            "What's the time in Paris right now?",
+            "What is the weather in London in Fahrenheit?",
+            "Weather in San Francisco vs Tokyo",
+            "What time is it in London when it's noon in Tokyo?",
+            "What is the weather like in the capital of France?",
+            "What's the weather like in London and the time in Tokyo?",
+            "What is 1990?",
+            "What is (42)?",
+            "What is 2024-01-15?",
+            "What is 2024-1-15?",
+            "Tell me a fun fact about giraffes.",
+        ]
+        for query in queries:
+            with self.subTest(query=query):
+                self.assertIsNone(route_query(query, TOOLS))
+
+    def test_skips_tools_the_server_does_not_offer(self):
+        self.assertIsNone(route_query("What time is it in Tokyo?", {"get_weather"}))
+
+
+class IsSimpleLookupTest(unittest.TestCase):
+    def test_plain_lookups(self):
+        for query in [
+            "What's the weather like in London?",
+            "What is 123 * 45 + 9?",
+            "Tell me the time in Tokyo, please.",
+        ]:
+            with self.subTest(query=query):
+                self.assertTrue(is_simple_lookup(query))
+
+    def test_comparisons_and_reasoning(self):
+        for query in [
+            "Is London warmer than Paris right now?",
+            "Should I bring an umbrella in London?",
+            "How hot is it in Tokyo compared to Paris?",
+            "Weather in London and Paris",
+            "Which is later, Tokyo or Sydney?",
+        ]:
+            with self.subTest(query=query):
+                self.assertFalse(is_simple_lookup(query))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+import importlib.util
+import unittest
+
+
+def _installed(*modules):
+    try:
+        return all(importlib.util.find_spec(module) is not None for module in modules)
+    except (ModuleNotFoundError, ValueError):
+        return False
+
+
+@unittest.skipUnless(_installed("mcp"), "server dependencies are not installed")
+class CalculateTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        from server import calculate
+
+        cls.calculate = staticmethod(calculate)
+
+    def test_evaluates_arithmetic_and_math_names(self):
+        cases = {
+            "123 * 45 + 9": "The result is: 5544",
+            "sqrt(16)": "The result is: 4.0",
+            "pi*2": "The result is: 6.283185307179586",
+            "2**10": "The result is: 1024",
+            "factorial(10)": "The result is: 3628800",
+        }
+        for expression, expected in cases.items():
+            with self.subTest(expression=expression):
+                self.assertEqual(self.calculate(expression), expected)
+
+    def test_rejects_oversized_computations(self):
+        for expression in ["9**9**8", "2.0**1e6", "(10**1000)**1000", "factorial(10**9)", "comb(5000,3)", "1e308**2"]:
+            with self.subTest(expression=expression):
+                self.assertTrue(self.calculate(expression).startswith("Error evaluating expression"))
+
+    def test_rejects_code_injection(self):
+        for expression in ['__import__("os")', "(1).__class__", "[].__class__", "(lambda: 1)()", "open('x')"]:
+            with self.subTest(expression=expression):
+                self.assertTrue(self.calculate(expression).startswith("Error evaluating expression"))
+
+
+if __name__ == "__main__":
+    unittest.main()